@@ -10,107 +10,560 @@ Usage:
 """
 
 import os
+import re
+import csv
+import json
+import time
+import hashlib
 import argparse
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 
 
-def parse_a3m_file(filename):
-    """Parse A3M file and return sequences dictionary"""
+# Records joined into one buffer per write call
+WRITE_BLOCK_RECORDS = 4096
+# Planning summaries kept in memory, enough for scaffolds reused across nearby manifest rows
+SUMMARY_CACHE_SIZE = 32
+_LOWERCASE = bytes(range(ord('a'), ord('z') + 1))
+_INSERTION = {str: re.compile('[a-z]'), bytes: re.compile(b'[a-z]')}
+_MATCH_COLUMN = {str: re.compile('[^a-z]'), bytes: re.compile(b'[^a-z]')}
+_NAME_END = {str: re.compile(r'\s|$'), bytes: re.compile(rb'\s|$')}
+# Bytes removed by bytes.strip, which the parsers apply to every line
+_WHITESPACE = frozenset(b' \t\n\r\x0b\x0c')
+
+
+def _disambiguate_header(header, sequences, occurrences):
+    """Unique header for a repeated one: '>ID_n rest', with n the occurrence number (2, 3, ...)
+
+    `occurrences` is the header index, so each repeat is resolved in O(1)
+    unless the generated name is itself taken.
+    """
+    cut = _NAME_END[type(header)].search(header).start()
+    n = occurrences.get(header, 1)
+    while True:
+        n += 1
+        suffix = f"_{n}" if isinstance(header, str) else f"_{n}".encode()
+        candidate = header[:cut] + suffix + header[cut:]
+        if candidate not in sequences:
+            occurrences[header] = n
+            return candidate
+
+
+def _parse_a3m_lines(lines, stats=None):
+    """Build the sequences dictionary from stripped A3M lines (str or bytes), first line excluded
+
+    The first header is the query. When search outputs from several databases
+    are concatenated, the query header starts each further block: its
+    repeated query row is skipped and the hits are merged into one dictionary.
+    Other repeated headers are renamed with _disambiguate_header instead of
+    overwriting earlier rows.
+    """
     sequences = {}
-    with open(filename, 'r') as f:
-        current_id = None
-        for i, line in enumerate(f):
-            if i == 0:  # Skip first line
+    occurrences = {}
+    query_id = None
+    current_id = None
+    query_blocks = recovered_rows = 0
+    for line in lines:
+        if line[:1] in ('>', b'>'):
+            current_id = line
+            if query_id is None:
+                query_id = current_id
+                query_blocks = 1
+            elif current_id == query_id:
+                query_blocks += 1
+                current_id = None
                 continue
-            if line.startswith('>'):
-                current_id = line.strip()
-                sequences[current_id] = ''
-            elif current_id is not None:
-                sequences[current_id] += line.strip()
+            elif current_id in sequences:
+                current_id = _disambiguate_header(current_id, sequences, occurrences)
+                recovered_rows += 1
+            sequences[current_id] = line[:0]
+        elif current_id is not None:
+            sequences[current_id] += line
+    if stats is not None:
+        stats.update(query_blocks=query_blocks, recovered_rows=recovered_rows)
     return sequences
 
 
+def parse_a3m_file(filename, stats=None):
+    """Parse A3M file and return sequences dictionary
+
+    Repeated query blocks are merged and duplicate headers disambiguated (see
+    _parse_a3m_lines); if `stats` is a dict it receives the number of query
+    blocks and of rows recovered from duplicate headers.
+    """
+    with open(filename, 'r') as f:
+        next(f, None)  # Skip first line
+        return _parse_a3m_lines((line.strip() for line in f), stats)
+
+
+def read_a3m_bytes(filename):
+    """Read an A3M file as raw bytes in a single read"""
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def parse_a3m_bytes(data, stats=None):
+    """Parse raw A3M bytes into a sequences dictionary without decoding
+
+    Same result as parse_a3m_file with bytes keys and values. Files with
+    one line per sequence and no repeated headers (the usual A3M layout) are
+    split, stripped and paired entirely in C, including files merged from
+    several search databases; anything else goes through the line loop.
+    """
+    lines = list(map(bytes.strip, data.split(b'\n')[1:]))  # Skip first line
+    while lines and not lines[-1]:
+        lines.pop()
+    headers, rows = lines[0::2], lines[1::2]
+    try:
+        single_line = (len(headers) == len(rows) and
+                       set(map(itemgetter(0), headers)) == {ord('>')} and
+                       ord('>') not in set(map(itemgetter(0), rows)))
+    except IndexError:  # Blank line somewhere
+        single_line = False
+    if single_line:
+        sequences = dict(zip(headers, rows))
+        # Only the query header may repeat (one per merged search block)
+        query_blocks = headers.count(headers[0]) if headers else 0
+        if len(sequences) == len(headers) - max(query_blocks - 1, 0):
+            if headers:
+                sequences[headers[0]] = rows[0]  # Keep the first block's query row
+            if stats is not None:
+                stats.update(query_blocks=query_blocks, recovered_rows=0)
+            return sequences
+    return _parse_a3m_lines(lines, stats)
+
+
+def _encode_blocks(records):
+    """Join formatted A3M records (str or bytes) into large encoded blocks, one at a time"""
+    for i in range(0, len(records), WRITE_BLOCK_RECORDS):
+        block = records[i:i + WRITE_BLOCK_RECORDS]
+        yield b''.join(block) if isinstance(block[0], bytes) else ''.join(block).encode()
+
+
+def _encoded_size(records):
+    """Number of bytes the records take once written"""
+    if records and isinstance(records[0], bytes):
+        return sum(map(len, records))
+    return sum(len(record.encode()) for record in records)
+
+
+def _split_records(records, shards):
+    """Split records into `shards` contiguous, nearly equal chunks, preserving order"""
+    size, extra = divmod(len(records), shards)
+    chunks, start = [], 0
+    for i in range(shards):
+        end = start + size + (i < extra)
+        chunks.append(records[start:end])
+        start = end
+    return chunks
+
+
+def shard_path(output_file, index):
+    """Path of one shard of a sharded output"""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.{index:03d}{ext}"
+
+
+def _write_shard_file(filename, records):
+    with open(filename, 'wb') as out:
+        out.writelines(_encode_blocks(records))
+
+
+def _pwrite_records(fd, records, offset):
+    for block in _encode_blocks(records):
+        view = memoryview(block)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+
+
+def write_msa(output_file, records, shards=1, keep_shards=False):
+    """Write formatted A3M records ("header\\nsequence\\n") in large blocks
+
+    With shards > 1 the records are split into contiguous chunks written by
+    parallel workers, either into one file at each chunk's byte offset or,
+    with keep_shards, into separate shard files. The single output is
+    byte-identical to a single-threaded write. Each worker encodes its chunk
+    one block at a time, so only a block per worker exists beside the records.
+    Returns the files written.
+    """
+    if shards > 1 and keep_shards:
+        shard_files = [shard_path(output_file, i) for i in range(shards)]
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            list(executor.map(_write_shard_file, shard_files, _split_records(records, shards)))
+        return shard_files
+
+    if shards <= 1 or not hasattr(os, 'pwrite'):
+        _write_shard_file(output_file, records)
+        return [output_file]
+
+    chunks = _split_records(records, shards)
+    sizes = [_encoded_size(chunk) for chunk in chunks]
+    offsets = [sum(sizes[:i]) for i in range(shards)]
+    fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        os.ftruncate(fd, sum(sizes))
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            list(executor.map(_pwrite_records, [fd] * shards, chunks, offsets))
+    finally:
+        os.close(fd)
+    return [output_file]
+
+
+def file_sha256(filename, data=None):
+    """SHA-256 hex digest of a file's bytes, from `data` if it was already read"""
+    if data is not None:
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def count_residues(sequence):
+    """Number of match columns in an A3M row (lowercase insertions are not columns)"""
+    if not isinstance(sequence, str):
+        return len(bytes(sequence).translate(None, _LOWERCASE))
+    return sum(1 for c in sequence if not c.islower())
+
+
+def crop_range(length, window, n_terminus):
+    """Scaffold match columns [start, end) kept next to the fusion junction
+
+    N-terminal fusions join the tag to the scaffold's first residue, so the
+    first `window` columns are kept; C-terminal fusions keep the last ones.
+    """
+    if window < 1:
+        raise ValueError(f"Crop window must be at least 1 residue, got {window}")
+    window = min(window, length)
+    return (0, window) if n_terminus else (length - window, length)
+
+
+def crop_a3m_row(row, start, end):
+    """Keep match columns [start, end) of an A3M row together with the insertions between them"""
+    if not _INSERTION[type(row)].search(row):
+        return row[start:end]
+    positions = [m.start() for m in _MATCH_COLUMN[type(row)].finditer(row)]
+    end = min(end, len(positions))
+    if start >= end:
+        return row[:0]
+    return row[positions[start]:positions[end - 1] + 1]
+
+
+def segments_path(output_file):
+    """Path of the segment sidecar written next to a concatenated MSA"""
+    return os.path.splitext(output_file)[0] + '.segments.json'
+
+
+def write_segments(output_file, segments, n_terminus, shard_files=None, crop=None):
+    """Write the segment sidecar: order, residue ranges (0-based, end exclusive), sources and row counts"""
+    start = 0
+    for segment in segments:
+        segment['start'] = start
+        segment['end'] = start + segment.pop('length')
+        start = segment['end']
+    sidecar = {'msa': os.path.basename(output_file),
+               'terminus': get_terminus_tag(n_terminus),
+               'length': start,
+               'segments': segments}
+    if crop is not None:
+        sidecar['crop'] = crop
+    if shard_files is not None:
+        sidecar['shards'] = [os.path.basename(shard_file) for shard_file in shard_files]
+    with open(segments_path(output_file), 'w') as f:
+        json.dump(sidecar, f, indent=2)
+
+
+def read_segments(filename):
+    """Read a segment sidecar and return {segment name: (start, end)}"""
+    with open(filename, 'r') as f:
+        return {segment['name']: (segment['start'], segment['end']) for segment in json.load(f)['segments']}
+
+
 def get_terminus_tag(n_terminus):
     """Get terminus identifier string"""
     return "N" if n_terminus else "C"
 
 
-def windowed_concatenation(file1, file2, output_file, n_terminus):
-    """Windowed MSA concatenation"""
-    sequences1 = parse_a3m_file(file1)  # scaffold
-    sequences2 = parse_a3m_file(file2)  # tag
+def windowed_concatenation(file1, file2, output_file, n_terminus, shards=1, keep_shards=False, binary=True,
+                           crop_window=None):
+    """Windowed MSA concatenation, with a segment sidecar next to the output
 
-    with open(output_file, 'w') as out:
-        all_ids = sorted(set(sequences1.keys()) | set(sequences2.keys()))
-        
-        # Write the key 101 first
-        if '>101' in all_ids:
-            out.write('>101\n')
-            seq1 = sequences1.get('>101', '-' * len(next(iter(sequences1.values()))))
-            seq2 = sequences2.get('>101', '-' * len(next(iter(sequences2.values()))))
-            if n_terminus:
-                out.write(f"{seq2}{seq1}\n")
-            else:
-                out.write(f"{seq1}{seq2}\n")
-            all_ids.remove('>101')
-
-        for seq_id in all_ids:
-            out.write(f"{seq_id}\n")
-            seq1 = sequences1.get(seq_id, '-' * len(next(iter(sequences1.values()))))
-            seq2 = sequences2.get(seq_id, '-' * len(next(iter(sequences2.values()))))
-            if n_terminus:
-                out.write(f"{seq2}{seq1}\n")
-            else:
-                out.write(f"{seq1}{seq2}\n")
+    By default the inputs are handled as raw bytes and never decoded; with
+    binary=False they go through the text parser. Both write identical bytes.
+
+    With crop_window, only the `crop_window` scaffold residues next to the
+    fusion junction are kept (see crop_range), every scaffold row is cropped
+    to the same match columns, and rows left without any residue are dropped.
+    """
+    stats1, stats2 = {}, {}
+    if binary:
+        data1, data2 = read_a3m_bytes(file1), read_a3m_bytes(file2)
+        sequences1 = parse_a3m_bytes(data1, stats1)  # scaffold
+        sequences2 = parse_a3m_bytes(data2, stats2)  # tag
+        query_id, empty, newline, gap = b'>101', b'', b'\n', b'-'
+    else:
+        data1 = data2 = None
+        sequences1 = parse_a3m_file(file1, stats1)  # scaffold
+        sequences2 = parse_a3m_file(file2, stats2)  # tag
+        query_id, empty, newline, gap = '>101', '', '\n', '-'
+
+    # Segment layout of the chimera, from the query rows already in memory
+    segments = []
+    for name, filename, data, sequences, stats in (('scaffold', file1, data1, sequences1, stats1),
+                                                   ('tag', file2, data2, sequences2, stats2)):
+        query = sequences.get(query_id, next(iter(sequences.values())))
+        segments.append({'name': name, 'source': os.path.abspath(filename), 'sha256': file_sha256(filename, data),
+                         'rows': len(sequences), 'length': count_residues(query), **stats})
+
+    crop = None
+    if crop_window is not None:
+        start, end = crop_range(segments[0]['length'], crop_window, n_terminus)
+        sequences1 = {seq_id: crop_a3m_row(seq, start, end) for seq_id, seq in sequences1.items()}
+        segments[0].update(length=end - start, source_start=start, source_end=end)
+        crop = {'segment': 'scaffold', 'window': crop_window, 'source_start': start, 'source_end': end}
+
+    if n_terminus:
+        segments.reverse()
+
+    all_ids = sorted(set(sequences1.keys()) | set(sequences2.keys()))
+    # Write the key 101 first
+    if query_id in all_ids:
+        all_ids.remove(query_id)
+        all_ids.insert(0, query_id)
+
+    # Gap padding for rows missing from one MSA, allocated once
+    gap1 = gap * len(next(iter(sequences1.values())))
+    gap2 = gap * len(next(iter(sequences2.values())))
+
+    if crop is not None:
+        # Rows whose residues were all outside the crop carry no information
+        n_rows = len(all_ids)
+        all_ids = [seq_id for seq_id in all_ids if seq_id == query_id or
+                   sequences1.get(seq_id, gap1).strip(gap) or sequences2.get(seq_id, gap2).strip(gap)]
+        crop['dropped_rows'] = n_rows - len(all_ids)
+    seqs1 = map(sequences1.get, all_ids, repeat(gap1))
+    seqs2 = map(sequences2.get, all_ids, repeat(gap2))
+    first, second = (seqs2, seqs1) if n_terminus else (seqs1, seqs2)
+    records = list(map(empty.join, zip(all_ids, repeat(newline), first, second, repeat(newline))))
+
+    shard_files = write_msa(output_file, records, shards, keep_shards)
+
+    write_segments(output_file, segments, n_terminus, shard_files if keep_shards and shards > 1 else None, crop)
+    return shard_files
+
+
+def read_manifest(filename):
+    """Read a batch manifest CSV with columns scaffold_msa, tag_msa and optionally output_file"""
+    with open(filename, 'r', newline='') as f:
+        return [(entry['scaffold_msa'], entry['tag_msa'], entry.get('output_file') or None)
+                for entry in csv.DictReader(f)]
+
+
+def get_jobs(args):
+    """List (scaffold_msa, tag_msa, output_base) jobs from the manifest or the single input pair"""
+    if args.manifest:
+        if not os.path.exists(args.manifest):
+            print(f"Error: Manifest file not found: {args.manifest}")
+            return None
+        entries = read_manifest(args.manifest)
+    else:
+        # Validate required inputs
+        if not args.scaffold_msa:
+            print("Error: --scaffold-msa is required")
+            return None
+        if not args.tag_msa:
+            print("Error: --tag-msa is required")
+            return None
+        entries = [(args.scaffold_msa, args.tag_msa, args.output_file)]
+
+    jobs = []
+    for scaffold_msa, tag_msa, output_file in entries:
+        # Check if input files exist
+        if not os.path.exists(scaffold_msa):
+            print(f"Error: Scaffold MSA file not found: {scaffold_msa}")
+            return None
+        if not os.path.exists(tag_msa):
+            print(f"Error: Tag MSA file not found: {tag_msa}")
+            return None
+
+        # Generate output file name from input files if not specified
+        if output_file:
+            output_base = output_file
+        else:
+            scaffold_name = os.path.splitext(os.path.basename(scaffold_msa))[0]
+            tag_name = os.path.splitext(os.path.basename(tag_msa))[0]
+            output_base = f"{scaffold_name}_{tag_name}"
+        jobs.append((scaffold_msa, tag_msa, output_base))
+    return jobs
 
 
 def run_concatenation(args):
     """Run MSA concatenation"""
-    
-    # Validate required inputs
-    if not args.scaffold_msa:
-        print("Error: --scaffold-msa is required")
-        return
-    if not args.tag_msa:
-        print("Error: --tag-msa is required")
-        return
-    
-    # Check if input files exist
-    if not os.path.exists(args.scaffold_msa):
-        print(f"Error: Scaffold MSA file not found: {args.scaffold_msa}")
-        return
-    if not os.path.exists(args.tag_msa):
-        print(f"Error: Tag MSA file not found: {args.tag_msa}")
+    jobs = get_jobs(args)
+    if jobs is None:
         return
     
     # Set output directory
     out_msas_folder = args.out_msas_folder or "./out_msas"
     os.makedirs(out_msas_folder, exist_ok=True)
     
-    # Generate output file name from input files if not specified
-    if args.output_file:
-        output_base = args.output_file
-    else:
-        scaffold_name = os.path.splitext(os.path.basename(args.scaffold_msa))[0]
-        tag_name = os.path.splitext(os.path.basename(args.tag_msa))[0]
-        output_base = f"{scaffold_name}_{tag_name}"
-    
     # Standard windowed concatenation mode
     print("Running windowed MSA concatenation...")
     
     processed_count = 0
-    for n_terminus in [True, False]:
-        terminus_tag = get_terminus_tag(n_terminus=n_terminus)
-        print(f"Processing: n_terminus={n_terminus}")
-        
-        # Concatenate
-        output_file = f'{out_msas_folder}/{terminus_tag}_{output_base}.a3m'
-        windowed_concatenation(args.scaffold_msa, args.tag_msa, output_file, n_terminus)
-        print(f"Created: {output_file}")
-        processed_count += 1
+    for scaffold_msa, tag_msa, output_base in jobs:
+        for n_terminus in [True, False]:
+            terminus_tag = get_terminus_tag(n_terminus=n_terminus)
+            print(f"Processing: n_terminus={n_terminus}")
+
+            # Concatenate
+            output_file = f'{out_msas_folder}/{terminus_tag}_{output_base}.a3m'
+            written = windowed_concatenation(scaffold_msa, tag_msa, output_file, n_terminus,
+                                             shards=args.write_shards, keep_shards=args.keep_shards,
+                                             crop_window=args.crop_window)
+            print(f"Created: {', '.join(written)}")
+            processed_count += 1
     
     print(f"Processed {processed_count} windowed concatenations")
 
 
+def _a3m_row_lengths(data):
+    """Headers and sequence byte lengths of raw A3M bytes in the usual layout, or None
+
+    With one line per sequence, no whitespace around the rows and only the
+    query header repeating, rows are measured straight from the split lines;
+    only the headers are stripped. Returns (headers, row lines, {header: length}).
+    """
+    lines = data.split(b'\n')[1:]  # Skip first line
+    while lines and not lines[-1].strip():
+        lines.pop()
+    headers, rows = list(map(bytes.strip, lines[0::2])), lines[1::2]
+    try:
+        row_ends = set(map(itemgetter(0), rows)) | set(map(itemgetter(-1), rows))
+        single_line = (len(headers) == len(rows) and
+                       set(map(itemgetter(0), headers)) == {ord('>')} and
+                       ord('>') not in row_ends and not row_ends & _WHITESPACE)
+    except IndexError:  # Blank line somewhere
+        return None
+    if not single_line or not headers:
+        return None
+    lengths = dict(zip(headers, map(len, rows)))
+    if len(lengths) != len(headers) - (headers.count(headers[0]) - 1):
+        return None  # Repeated hit headers are disambiguated by the parser
+    lengths[headers[0]] = len(rows[0])  # Keep the first block's query row
+    return headers, rows, lengths
+
+
+@lru_cache(maxsize=SUMMARY_CACHE_SIZE)
+def summarize_a3m(filename):
+    """Query length and {header: sequence byte length} of an A3M, without keeping the sequences
+
+    The query length comes from the '#len' header line when present. Headers
+    are needed because rows shared by both MSAs are written once. Files not
+    in the usual layout (see _a3m_row_lengths) are fully parsed instead.
+    """
+    data = read_a3m_bytes(filename)
+    summary = _a3m_row_lengths(data)
+    if summary is not None:
+        headers, rows, lengths = summary
+        query = rows[headers.index(b'>101')] if b'>101' in lengths else rows[0]
+    else:
+        sequences = parse_a3m_bytes(data)
+        lengths = dict(zip(sequences.keys(), map(len, sequences.values())))
+        query = sequences.get(b'>101', next(iter(sequences.values())))
+    first_line = data[:data.find(b'\n')]
+    if first_line.startswith(b'#') and first_line[1:].split()[:1] and first_line[1:].split()[0].isdigit():
+        query_length = int(first_line[1:].split()[0])
+    else:
+        query_length = count_residues(query)
+    return query_length, lengths
+
+
+def plan_concatenation(file1, file2, crop_window=None):
+    """Output dimensions of windowed_concatenation(file1, file2, ...) without running it
+
+    Returns (chimera length, rows, output bytes, exact). Both termini have the
+    same dimensions. With crop_window the length is exact but rows and bytes
+    are upper bounds, since all-gap rows are only known after cropping.
+    """
+    query_length1, lengths1 = summarize_a3m(file1)  # scaffold
+    query_length2, lengths2 = summarize_a3m(file2)  # tag
+    all_ids = lengths1.keys() | lengths2.keys()
+    rows = len(all_ids)
+
+    # Each record is "header\n" + scaffold part + tag part + "\n"
+    gap1 = next(iter(lengths1.values()))
+    gap2 = next(iter(lengths2.values()))
+    header_bytes = sum(map(len, all_ids)) + 2 * rows
+    tag_bytes = sum(lengths2.values()) + (rows - len(lengths2)) * gap2
+    if crop_window is None:
+        scaffold_bytes = sum(lengths1.values()) + (rows - len(lengths1)) * gap1
+        return query_length1 + query_length2, rows, header_bytes + scaffold_bytes + tag_bytes, True
+
+    start, end = crop_range(query_length1, crop_window, True)
+    window = end - start
+    # Cropped rows keep at most their own bytes and at least the window
+    scaffold_bytes = sum(min(length, window + length - query_length1) for length in lengths1.values())
+    scaffold_bytes += (rows - len(lengths1)) * window
+    return window + query_length2, rows, header_bytes + scaffold_bytes + tag_bytes, False
+
+
+PLAN_COLUMNS = ['output_file', 'scaffold_msa', 'tag_msa', 'chimera_length', 'rows', 'output_bytes', 'exact', 'plan_ms']
+
+
+def run_plan(args):
+    """Predict output MSA sizes for every job without writing them"""
+    jobs = get_jobs(args)
+    if jobs is None:
+        return
+
+    out_msas_folder = args.out_msas_folder or "./out_msas"
+    plan = []
+    for scaffold_msa, tag_msa, output_base in jobs:
+        start = time.perf_counter()
+        length, rows, output_bytes, exact = plan_concatenation(scaffold_msa, tag_msa, args.crop_window)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for n_terminus in [True, False]:
+            terminus_tag = get_terminus_tag(n_terminus=n_terminus)
+            plan.append({'output_file': f'{out_msas_folder}/{terminus_tag}_{output_base}.a3m',
+                         'scaffold_msa': scaffold_msa, 'tag_msa': tag_msa,
+                         'chimera_length': length, 'rows': rows, 'output_bytes': output_bytes,
+                         'exact': exact, 'plan_ms': round(elapsed_ms / 2, 3)})
+
+    if args.plan_output:
+        with open(args.plan_output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=PLAN_COLUMNS)
+            writer.writeheader()
+            writer.writerows(plan)
+        print(f"Wrote plan for {len(plan)} outputs to {args.plan_output}")
+    else:
+        for job in plan:
+            print(f"{job['output_file']}: length {job['chimera_length']}, {job['rows']} rows, "
+                  f"{job['output_bytes']} bytes{'' if job['exact'] else ' (upper bound)'}")
+
+    if plan:
+        lengths = [job['chimera_length'] for job in plan]
+        print(f"Total: {len(plan)} outputs, {sum(job['output_bytes'] for job in plan)} bytes, "
+              f"{sum(job['rows'] for job in plan)} rows")
+        print(f"Chimera length: max {max(lengths)}, mean {sum(lengths) / len(lengths):.1f}; "
+              f"max rows {max(job['rows'] for job in plan)}; "
+              f"sum of squared lengths {sum(length ** 2 for length in lengths)}")
+        print(f"Planned in {sum(job['plan_ms'] for job in plan) / len(jobs):.2f} ms per job")
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def create_parser():
     """Create command line argument parser"""
     parser = argparse.ArgumentParser(
@@ -123,17 +576,33 @@ Examples:
   
   # With custom output folder and filename
   python afchimera.py --scaffold-msa scaffold.a3m --tag-msa tag.a3m --out-msas-folder ./results --output-file my_chimera
+
+  # Estimate output sizes of a batch of jobs before running it
+  python afchimera.py --manifest jobs.csv --plan --plan-output plan.csv
         """
     )
     
-    parser.add_argument('--scaffold-msa', required=True,
+    parser.add_argument('--scaffold-msa',
                        help='Path to the scaffold sequence MSA file (.a3m)')
-    parser.add_argument('--tag-msa', required=True,
+    parser.add_argument('--tag-msa',
                        help='Path to the tag MSA file (.a3m)')
+    parser.add_argument('--manifest',
+                       help='CSV of jobs with columns scaffold_msa, tag_msa and optionally output_file '
+                            '(replaces --scaffold-msa/--tag-msa/--output-file)')
     parser.add_argument('--out-msas-folder', default='./out_msas',
                        help='Output MSAs folder (default: ./out_msas)')
     parser.add_argument('--output-file',
                        help='Base name for output files (auto-generated if not specified)')
+    parser.add_argument('--crop-window', type=positive_int,
+                       help='Keep only this many scaffold residues next to the fusion junction (default: no crop)')
+    parser.add_argument('--write-shards', type=positive_int, default=1,
+                       help='Split the output write across this many parallel workers (default: 1)')
+    parser.add_argument('--keep-shards', action='store_true',
+                       help='Leave the output as separate shard files instead of one file')
+    parser.add_argument('--plan', action='store_true',
+                       help='Only predict output lengths, row counts and sizes, without writing MSAs')
+    parser.add_argument('--plan-output',
+                       help='With --plan, write the per-output estimates to this CSV')
     
     return parser
 
@@ -144,8 +613,12 @@ def main():
     args = parser.parse_args()
     
     try:
-        run_concatenation(args)
-        print("Successfully completed windowed concatenation!")
+        if args.plan:
+            run_plan(args)
+            print("Successfully completed planning!")
+        else:
+            run_concatenation(args)
+            print("Successfully completed windowed concatenation!")
         
     except Exception as e:
         print(f"Error during execution: {e}")
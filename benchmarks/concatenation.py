@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bytes and text concatenation paths on a large synthetic MSA
+
+The scaffold MSA is inflated by repeating its hit rows under unique headers
+until it has the requested number of rows, then both paths of
+windowed_concatenation are timed on it and their outputs compared byte for byte.
+
+Usage:
+    python benchmarks/concatenation.py [--rows 200000] [--repeats 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from afchimera import windowed_concatenation  # noqa: E402
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+def make_large_msa(source, output_file, rows):
+    """Write an MSA with the header and query of `source` and `rows` hits cycled from it"""
+    with open(source, 'r') as f:
+        lines = f.read().split('\n')
+    header, query = lines[:3], lines[3:]
+    hits = [(query[i], query[i + 1]) for i in range(0, len(query) - 1, 2)]
+    with open(output_file, 'w') as out:
+        out.write('\n'.join(header) + '\n')
+        for i in range(rows):
+            hit_id, sequence = hits[i % len(hits)]
+            out.write(f"{hit_id}_{i}\n{sequence}\n")
+
+
+def best_time(repeats, func, *args, **kwargs):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bytes vs text MSA concatenation")
+    parser.add_argument('--scaffold-msa', default=os.path.join(EXAMPLES, 'gst_scaffold.a3m'),
+                        help='MSA whose hits are repeated to build the large input')
+    parser.add_argument('--tag-msa', default=os.path.join(EXAMPLES, 'tag.a3m'),
+                        help='Tag MSA (default: examples/tag.a3m)')
+    parser.add_argument('--rows', type=int, default=200000,
+                        help='Number of hit rows in the synthetic scaffold MSA (default: 200000)')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Timed runs per path, the best is reported (default: 3)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scaffold = os.path.join(tmp, 'scaffold.a3m')
+        make_large_msa(args.scaffold_msa, scaffold, args.rows)
+        size_mb = os.path.getsize(scaffold) / 1e6
+        print(f"Scaffold MSA: {args.rows} rows, {size_mb:.1f} MB")
+
+        outputs = {}
+        timings = {}
+        for name, binary in (('text', False), ('bytes', True)):
+            outputs[name] = os.path.join(tmp, f'{name}.a3m')
+            timings[name] = best_time(args.repeats, windowed_concatenation, scaffold, args.tag_msa,
+                                      outputs[name], True, binary=binary)
+            print(f"{name:>5}: {timings[name]:.3f}s ({size_mb / timings[name]:.0f} MB/s)")
+
+        with open(outputs['text'], 'rb') as f1, open(outputs['bytes'], 'rb') as f2:
+            identical = f1.read() == f2.read()
+        print(f"Speedup: {timings['text'] / timings['bytes']:.2f}x, identical output: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+AFChimera evaluation - tag RMSD and mean pLDDT of predicted chimera structures
+
+Streams predicted structures (PDB or mmCIF), extracts the CA coordinates and
+B-factors of the tag region, superposes them on the reference tag structure and
+writes one row per (tag, scaffold, terminus) in the schema read by
+figs_reproduction.
+
+The manifest is a CSV with columns tag_id, scaffold_id, terminus, method, path
+and optionally num_msa_hits and segments. method is one of af2, af2_fix, af3,
+af3_fix, esm, esm_argmax. segments is the sidecar written by afchimera.py next
+to the chimera MSA; when given, the tag residues are sliced from it directly.
+Reference structures are looked up as <reference-dir>/<tag_id>.pdb (or .cif).
+
+With --plddt-store, the full per-residue B-factors of every prediction are also
+appended to a memory-mapped store (see plddt_store.py) for tag-region and
+junction analysis without re-reading the structures.
+
+Usage:
+    python evaluate.py --manifest predictions.csv --reference-dir refs/ --output results.csv
+"""
+
+import os
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from afchimera import read_segments
+from plddt_store import PlddtStoreWriter
+
+
+METHODS = ['af2', 'af2_fix', 'af3', 'af3_fix', 'esm', 'esm_argmax']
+KEY_COLUMNS = ['tag_id', 'scaffold_id', 'terminus']
+# With --plddt-store, rows are written to the CSV in batches right after the store index
+STORE_FLUSH_ROWS = 1000
+RESULT_COLUMNS = KEY_COLUMNS + ['num_msa_hits'] + [
+    f"{method}_{metric}" for method in METHODS for metric in ('rmsd', 'mean_bfactor')
+]
+
+
+def _parse_pdb_ca(f):
+    """Stream alpha-carbon atoms of the first polymer chain of the first model of a PDB file
+
+    Only ATOM records with the exact atom name ' CA ' count, so calcium ions
+    (HETATM 'CA  ') and ligands are never taken for residues.
+    """
+    coords, bfactors = [], []
+    chain = None
+    for line in f:
+        if line.startswith('ENDMDL'):
+            break
+        if not line.startswith('ATOM') or line[12:16] != ' CA ':
+            continue
+        if line[16] not in (' ', 'A'):  # Keep the first alternate location only
+            continue
+        if chain is None:
+            chain = line[21]
+        elif line[21] != chain:
+            break
+        coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+        bfactors.append(float(line[60:66]))
+    return coords, bfactors
+
+
+def _parse_mmcif_ca(f):
+    """Stream alpha-carbon atoms of the first polymer chain of the first model from the
+    _atom_site loop of an mmCIF file, skipping HETATM records such as calcium ions"""
+    coords, bfactors = [], []
+    chain = None
+    columns = []
+    in_atom_site = False
+    for line in f:
+        if line.startswith('_atom_site.'):
+            in_atom_site = True
+            columns.append(line.strip().split('.', 1)[1])
+            continue
+        if not in_atom_site or not columns:
+            continue
+        if line.startswith(('#', 'loop_', '_')):
+            break
+        fields = line.split()
+        if len(fields) != len(columns):
+            continue
+        row = dict(zip(columns, fields))
+        if row.get('pdbx_PDB_model_num', '1') != '1':
+            break
+        if row.get('group_PDB', 'ATOM') != 'ATOM' or row.get('type_symbol', 'C') != 'C':
+            continue
+        if row.get('label_atom_id', row.get('auth_atom_id')) != 'CA':
+            continue
+        if row.get('label_alt_id', '.') not in ('.', '?', 'A'):
+            continue
+        asym_id = row.get('label_asym_id', row.get('auth_asym_id'))
+        if chain is None:
+            chain = asym_id
+        elif asym_id != chain:
+            break
+        coords.append((float(row['Cartn_x']), float(row['Cartn_y']), float(row['Cartn_z'])))
+        bfactors.append(float(row['B_iso_or_equiv']))
+    return coords, bfactors
+
+
+def read_ca_atoms(filename):
+    """Read CA coordinates (L, 3) and B-factors (L,) from a PDB or mmCIF file"""
+    with open(filename, 'r') as f:
+        if filename.endswith(('.cif', '.mmcif')):
+            coords, bfactors = _parse_mmcif_ca(f)
+        else:
+            coords, bfactors = _parse_pdb_ca(f)
+    return np.array(coords, dtype=np.float64).reshape(-1, 3), np.array(bfactors, dtype=np.float64)
+
+
+@lru_cache(maxsize=None)
+def load_reference(reference_dir, tag_id):
+    """Reference tag CA coordinates, cached per worker process"""
+    for ext in ('.pdb', '.cif'):
+        filename = os.path.join(reference_dir, f"{tag_id}{ext}")
+        if os.path.exists(filename):
+            return read_ca_atoms(filename)[0]
+    raise FileNotFoundError(f"Reference structure not found for tag {tag_id} in {reference_dir}")
+
+
+def tag_region(n_residues, tag_length, terminus, segments_file=''):
+    """Slice of the tag residues in a chain: from the segment sidecar if available,
+    else leading for N-terminal fusions and trailing for C-terminal"""
+    if segments_file:
+        return slice(*read_segments(segments_file)['tag'])
+    if terminus == 'C':
+        return slice(n_residues - tag_length, n_residues)
+    return slice(0, tag_length)
+
+
+def kabsch_rmsd(mobile, target):
+    """RMSD after optimal superposition of each of B coordinate sets (B, L, 3) onto target (L, 3)"""
+    mobile = mobile - mobile.mean(axis=1, keepdims=True)
+    target = target - target.mean(axis=0)
+    covariance = np.einsum('bli,lj->bij', mobile, target)
+    u, s, vt = np.linalg.svd(covariance)
+    # Flip the smallest singular value where the optimal rotation would be a reflection
+    s[:, -1] *= np.sign(np.linalg.det(u @ vt))
+    e0 = (mobile ** 2).sum(axis=(1, 2)) + (target ** 2).sum()
+    msd = (e0 - 2 * s.sum(axis=1)) / target.shape[0]
+    return np.sqrt(np.maximum(msd, 0.0))
+
+
+def evaluate_chimera(job):
+    """Compute tag RMSD and mean tag B-factor for every method of one (tag, scaffold, terminus)
+
+    Also returns the per-residue B-factors and tag range of each prediction as
+    (method, bfactors, tag_start, tag_end) for the pLDDT store, and whether
+    every listed prediction produced metrics.
+    """
+    key, num_msa_hits, paths, reference_dir = job
+    tag_id, scaffold_id, terminus = key
+    row = dict(zip(KEY_COLUMNS, key))
+    row['num_msa_hits'] = num_msa_hits
+
+    try:
+        reference = load_reference(reference_dir, tag_id)
+    except Exception as e:
+        print(f"Warning: skipping {tag_id} {scaffold_id} {terminus}: cannot read reference: {e}")
+        return row, [], False
+    tag_length = len(reference)
+    methods, coords, plddt = [], [], []
+    for method, (path, segments_file) in paths.items():
+        # A missing or corrupt file only loses this prediction, not the run
+        try:
+            ca, bfactors = read_ca_atoms(path)
+            region = tag_region(len(ca), tag_length, terminus, segments_file)
+        except Exception as e:
+            print(f"Warning: skipping {path}: {e}")
+            continue
+        if len(ca[region]) != tag_length:
+            print(f"Warning: {path} has {len(ca[region])} tag CA atoms, expected {tag_length} for tag {tag_id}")
+            continue
+        row[f"{method}_mean_bfactor"] = float(bfactors[region].mean())
+        methods.append(method)
+        coords.append(ca[region])
+        plddt.append((method, bfactors, region.start, region.stop))
+
+    if methods:
+        # One batched SVD over all predictions of this chimera
+        for method, rmsd in zip(methods, kabsch_rmsd(np.stack(coords), reference)):
+            row[f"{method}_rmsd"] = float(rmsd)
+    return row, plddt, len(methods) == len(paths)
+
+
+def read_manifest(filename, reference_dir):
+    """Group manifest rows into one job per (tag_id, scaffold_id, terminus), in first-seen order"""
+    jobs = {}
+    with open(filename, 'r', newline='') as f:
+        for entry in csv.DictReader(f):
+            if entry['method'] not in METHODS:
+                raise ValueError(f"Unknown method '{entry['method']}' in manifest, expected one of {METHODS}")
+            key = tuple(entry.get(column) or '' for column in KEY_COLUMNS)
+            if key not in jobs:
+                jobs[key] = (key, entry.get('num_msa_hits', ''), {}, reference_dir)
+            jobs[key][2][entry['method']] = (entry['path'], entry.get('segments') or '')
+    return list(jobs.values())
+
+
+def completed_keys(output_file):
+    """Keys already present in an existing output, so interrupted runs can resume
+
+    Only complete chimeras are written, so failed ones are retried on resume.
+    """
+    if not os.path.exists(output_file):
+        return set()
+    with open(output_file, 'r', newline='') as f:
+        return {tuple(row[column] for column in KEY_COLUMNS) for row in csv.DictReader(f)}
+
+
+def _commit_rows(out, writer, rows, store):
+    """Write pending rows after saving the pLDDT store index, so the CSV never lists a
+    chimera the store could lose (a crash in between only re-evaluates these rows)"""
+    if store is not None:
+        store.flush()
+    writer.writerows(rows)
+    out.flush()
+    rows.clear()
+
+
+def run_evaluation(args):
+    """Run structure evaluation"""
+    if not os.path.exists(args.manifest):
+        print(f"Error: Manifest file not found: {args.manifest}")
+        return
+    if not os.path.isdir(args.reference_dir):
+        print(f"Error: Reference directory not found: {args.reference_dir}")
+        return
+
+    jobs = read_manifest(args.manifest, args.reference_dir)
+    done = completed_keys(args.output)
+    jobs = [job for job in jobs if job[0] not in done]
+    print(f"Evaluating {len(jobs)} chimeras ({len(done)} already in {args.output})")
+
+    failed = 0
+    write_header = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+    store = PlddtStoreWriter(args.plddt_store) if args.plddt_store else None
+    with open(args.output, 'a', newline='') as out, ProcessPoolExecutor(max_workers=args.workers) as executor:
+        writer = csv.DictWriter(out, fieldnames=RESULT_COLUMNS, restval='')
+        if write_header:
+            writer.writeheader()
+        # Rows are appended in manifest order as soon as they are ready, or in
+        # batches committed together with the pLDDT store index
+        pending = []
+        try:
+            results = executor.map(evaluate_chimera, jobs, chunksize=args.chunksize)
+            for processed_count, (row, plddt, complete) in enumerate(results, 1):
+                if not complete:
+                    # Left out of the output so the next run evaluates it again
+                    failed += 1
+                    continue
+                if store is not None:
+                    for method, bfactors, tag_start, tag_end in plddt:
+                        store.append(row['tag_id'], row['scaffold_id'], row['terminus'], method,
+                                     bfactors, tag_start, tag_end)
+                pending.append(row)
+                if store is None or len(pending) >= STORE_FLUSH_ROWS:
+                    _commit_rows(out, writer, pending, store)
+                if processed_count % 1000 == 0:
+                    print(f"Evaluated {processed_count}/{len(jobs)}")
+        finally:
+            _commit_rows(out, writer, pending, store)
+            if store is not None:
+                store.close()
+
+    print(f"Wrote {len(jobs) - failed} rows to {args.output}")
+    if failed:
+        print(f"Warning: {failed} chimeras had unreadable or mismatched predictions and were not written; "
+              f"they are retried on the next run")
+
+
+def create_parser():
+    """Create command line argument parser"""
+    parser = argparse.ArgumentParser(
+        description="AFChimera - tag RMSD and mean pLDDT of predicted chimera structures",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Evaluate all predictions listed in a manifest
+  python evaluate.py --manifest predictions.csv --reference-dir refs/ --output tag_scaffold_results.csv
+
+  # Re-running with the same output resumes and only evaluates missing chimeras
+  python evaluate.py --manifest predictions.csv --reference-dir refs/ --output tag_scaffold_results.csv --workers 32
+        """
+    )
+
+    parser.add_argument('--manifest', required=True,
+                       help='CSV with columns tag_id, scaffold_id, terminus, method, path [, num_msa_hits, segments]')
+    parser.add_argument('--reference-dir', required=True,
+                       help='Directory with reference tag structures named <tag_id>.pdb or <tag_id>.cif')
+    parser.add_argument('--output', default='tag_scaffold_results.csv',
+                       help='Results CSV, appended to incrementally (default: tag_scaffold_results.csv)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Number of worker processes (default: one per CPU)')
+    parser.add_argument('--chunksize', type=int, default=16,
+                       help='Chimeras sent to a worker at a time (default: 16)')
+    parser.add_argument('--plddt-store',
+                       help='Also append per-residue pLDDT of every prediction to this store directory')
+
+    return parser
+
+
+def main():
+    """Main function"""
+    parser = create_parser()
+    args = parser.parse_args()
+
+    try:
+        run_evaluation(args)
+        print("Successfully completed evaluation!")
+
+    except Exception as e:
+        print(f"Error during execution: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
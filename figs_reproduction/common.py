@@ -0,0 +1,43 @@
+"""Shared data loading for the figure scripts"""
+
+import pandas as pd
+
+
+CORRUPT_TAGS = ["2nr1", "1niz", "2l4g", "1v4z", "1yyb"]
+RESULTS_CSV = "tag_scaffold_results_fix.csv"
+BFACTOR_CSV = "tag_scaffold_results_fix_with_bfactors.csv"
+
+# Good tag selection: AF3 predicts the isolated tag well and the tag MSA is not empty
+threshold = 1.0
+msa_filter = True
+
+
+def load_results(path):
+    """Read a results CSV as written by the evaluation pipeline"""
+    return pd.read_csv(path)
+
+
+def remove_corrupt_tags(df):
+    """Drop tags whose reference structures are known to be broken"""
+    return df[~df['tag_id'].isin(CORRUPT_TAGS)]
+
+
+def select_good_tags(df):
+    """Tags with a reliable no-scaffold AF3 prediction and more than two MSA hits"""
+    no_scaffold_df = df[df['scaffold_id'] == "no_scaffold"][['af3_rmsd', 'tag_id', 'num_msa_hits']].dropna()
+    return no_scaffold_df[(no_scaffold_df['af3_rmsd'] < threshold) &
+                          (no_scaffold_df['num_msa_hits'] > 2)]['tag_id'].unique()
+
+
+def prepare_frames(results_csv=RESULTS_CSV, bfactor_csv=BFACTOR_CSV):
+    """Load and clean every table the figures need, once"""
+    raw = load_results(results_csv)
+    results = remove_corrupt_tags(raw)
+    bfactors = remove_corrupt_tags(load_results(bfactor_csv))
+    return {
+        "raw": raw,
+        "results": results,
+        "good_tags": select_good_tags(results),
+        "bfactors": bfactors,
+        "bfactor_good_tags": select_good_tags(bfactors),
+    }
@@ -1,30 +1,21 @@
-import pandas as pd
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-from scipy.stats import ecdf
 import seaborn as sns
 sns.set_style("white")
 sns.despine()
 
+from common import RESULTS_CSV, load_results, remove_corrupt_tags, select_good_tags
 
-CORRUPT_TAGS = ["2nr1", "1niz", "2l4g", "1v4z", "1yyb"]
-df = pd.read_csv("tag_scaffold_results_fix.csv")
-# Remove corrupt tags
-df = df[~df['tag_id'].isin(CORRUPT_TAGS)]
-threshold = 1.0
-msa_filter = True
 
 esm_column = "esm_rmsd"
 
-df_no_scaffold = df[df['scaffold_id'] == "no_scaffold"][[f"af2_rmsd", "af3_rmsd", "af2_fix_rmsd", "af3_fix_rmsd", "tag_id", "num_msa_hits", "scaffold_id", "terminus", esm_column]]
-# df_no_scaffold = df_no_scaffold.dropna()
-good_tags = df_no_scaffold[(df_no_scaffold[f"af3_rmsd"] < threshold) & (df_no_scaffold['num_msa_hits'] > 2)]['tag_id'].unique()
-num_good_tags = len(good_tags)
-df_no_scaffold = df_no_scaffold[df_no_scaffold['tag_id'].isin(good_tags)]
-df_scaffold = df[df['scaffold_id'] != "no_scaffold"][[f"af2_rmsd", "af3_rmsd", "af2_fix_rmsd", "af3_fix_rmsd", "tag_id", "num_msa_hits", "scaffold_id", "terminus", esm_column]]
-df_scaffold = df_scaffold[df_scaffold['tag_id'].isin(good_tags)]
-print("Num chimeras under consideration: ", len(df_scaffold))
-
 # Define color scheme
 af2_colors = {
     'no_scaffold': '#d62728',  # Bright Red
@@ -38,84 +29,124 @@ af3_colors = {
     'fix': '#31a354',          # Light Green
 }
 
-# Plot the ECDFs
-plt.figure(figsize=(12, 6))
-
-# Remove ESM3 plotting code and just keep AF2/AF3
-for algorithm in ["af2", "af3"]:
-    # Select colors based on algorithm
-    if algorithm == 'af2':
-        colors = af2_colors
-    else:
-        colors = af3_colors
-    
-    # Calculate ECDFs
-    ecdf_no_scaffold = ecdf(df_no_scaffold[f"{algorithm}_rmsd"].dropna()).cdf
-    ecdf_scaffold = ecdf(df_scaffold[f"{algorithm}_rmsd"].dropna()).cdf
-    ecdf_fix = ecdf(df_scaffold[f"{algorithm}_fix_rmsd"].dropna()).cdf
-
-    # Plot lines with specified colors
-    plt.plot(ecdf_no_scaffold.quantiles, ecdf_no_scaffold.probabilities, 
-             label=f'AlphaFold-{algorithm[-1]} (No Scaffold)', 
-             color=colors['no_scaffold'], linewidth=3)
-    plt.plot(ecdf_scaffold.quantiles, ecdf_scaffold.probabilities, 
-             label=f'AlphaFold-{algorithm[-1]}', 
-             color=colors['scaffold'], linewidth=3)
-    plt.plot(ecdf_fix.quantiles, ecdf_fix.probabilities, 
-             label=f'AlphaFold-{algorithm[-1]} + Windowed MSA', 
-             color=colors['fix'], linewidth=3)
-
-plt.xlim(0, 7)
-plt.ylim(0, 1)
-plt.xticks(fontsize=18)
-plt.yticks(fontsize=18)
-plt.xlabel('RMSD (Å)', fontsize=18)
-plt.ylabel("Proportion of tags with RMSD < xÅ", fontsize=18)
-plt.legend(fontsize=18, ncol=2, loc='lower right')
-plt.grid(True, alpha=0.5)
-plt.tight_layout()
-plt.savefig(f'aggregate_before_vs_after_fix.pdf', dpi=600, bbox_inches='tight')
-plt.close()
-
-# Create separate plots for each scaffold + terminus combination
-for scaffold_idx, scaffold in enumerate(df_scaffold['scaffold_id'].unique()):
-    scaffold_data = df_scaffold[df_scaffold['scaffold_id'] == scaffold]
-    for terminus in scaffold_data['terminus'].unique():
-        terminus_data = scaffold_data[scaffold_data['terminus'] == terminus]
-        
-        plt.figure(figsize=(12, 6))
-        
-        # Plot no_scaffold baseline and other curves (ESM3 removed)
-        for algorithm in ["af2", "af3"]:
-            ecdf_no = ecdf(df_no_scaffold[f"{algorithm}_rmsd"].dropna()).cdf
-            plt.plot(ecdf_no.quantiles, ecdf_no.probabilities,
-                     label=f'AlphaFold-{algorithm[-1]} (No Scaffold)',
-                     color=af2_colors['no_scaffold'] if algorithm == 'af2' else af3_colors['no_scaffold'],
-                     linewidth=3)
-        
-            # Original scaffold predictions
-            ecdf_scaf = ecdf(terminus_data[f"{algorithm}_rmsd"].dropna()).cdf
-            plt.plot(ecdf_scaf.quantiles, ecdf_scaf.probabilities,
-                     linewidth=3,
-                     color=af2_colors['scaffold'] if algorithm == 'af2' else af3_colors['scaffold'],
-                     label=f'AlphaFold-{algorithm[-1]}')
-            
-            # Fixed MSA predictions
-            ecdf_fix = ecdf(terminus_data[f"{algorithm}_fix_rmsd"].dropna()).cdf
-            plt.plot(ecdf_fix.quantiles, ecdf_fix.probabilities,
-                     linewidth=3,
-                     color=af2_colors['fix'] if algorithm == 'af2' else af3_colors['fix'],
-                     label=f'AlphaFold-{algorithm[-1]} + Windowed MSA')
-
-        plt.xlim(0, 7)
-        plt.ylim(0, 1)
-        plt.xticks(fontsize=18)
-        plt.yticks(fontsize=18)
-        plt.xlabel('RMSD (Å)', fontsize=18)
-        plt.ylabel("Proportion of tags with RMSD < xÅ", fontsize=18)
-        plt.title(f'Scaffold: {scaffold}, Terminus: {terminus}', fontsize=20)
-        plt.legend(fontsize=14, ncol=2, loc='lower right')
-        plt.grid(True, alpha=0.5)
-        plt.tight_layout()
-        plt.savefig(f'aggregate_rmsd_{scaffold}_{terminus}.pdf', dpi=600, bbox_inches='tight')
-        plt.close()
\ No newline at end of file
+# Full-quality output and the cheap preview used while iterating on the layout
+PDF_DPI = 600
+PREVIEW_DPI = 72
+
+
+def ecdf(values):
+    """Sort-based empirical CDF, returning (quantiles, probabilities) like scipy's ecdf().cdf"""
+    x = np.sort(np.asarray(values, dtype=float))
+    x = x[~np.isnan(x)]
+    # Last occurrence of each distinct value carries its cumulative probability
+    last = np.ones(len(x), dtype=bool)
+    last[:-1] = x[1:] != x[:-1]
+    return x[last], (np.flatnonzero(last) + 1) / len(x)
+
+
+def prepare_subsets(df, good_tags):
+    """Split cleaned results into the no-scaffold baseline and per (scaffold, terminus) subsets"""
+    columns = ["af2_rmsd", "af3_rmsd", "af2_fix_rmsd", "af3_fix_rmsd", "tag_id", "num_msa_hits", "scaffold_id", "terminus", esm_column]
+    df_no_scaffold = df[df['scaffold_id'] == "no_scaffold"][columns]
+    df_no_scaffold = df_no_scaffold[df_no_scaffold['tag_id'].isin(good_tags)]
+    df_scaffold = df[df['scaffold_id'] != "no_scaffold"][columns]
+    df_scaffold = df_scaffold[df_scaffold['tag_id'].isin(good_tags)]
+    print("Num chimeras under consideration: ", len(df_scaffold))
+
+    subsets = {"no_scaffold": df_no_scaffold, "scaffold": df_scaffold}
+    # Filter each scaffold + terminus combination once instead of per plot
+    for (scaffold, terminus), group in df_scaffold.groupby(['scaffold_id', 'terminus'], sort=False):
+        subsets[(scaffold, terminus)] = group
+    return subsets
+
+
+def make_ecdf_lookup(subsets):
+    """Memoised ECDF of one column of one subset, computed at most once per (subset, column)"""
+    @lru_cache(maxsize=None)
+    def subset_ecdf(subset, column):
+        return ecdf(subsets[subset][column].to_numpy())
+    return subset_ecdf
+
+
+def panel_curves(subset_ecdf, subset):
+    """Collect the (quantiles, probabilities, label, color) curves of one panel"""
+    curves = []
+    for algorithm in ["af2", "af3"]:
+        colors = af2_colors if algorithm == 'af2' else af3_colors
+        curves.append((*subset_ecdf("no_scaffold", f"{algorithm}_rmsd"),
+                       f'AlphaFold-{algorithm[-1]} (No Scaffold)', colors['no_scaffold']))
+        curves.append((*subset_ecdf(subset, f"{algorithm}_rmsd"),
+                       f'AlphaFold-{algorithm[-1]}', colors['scaffold']))
+        curves.append((*subset_ecdf(subset, f"{algorithm}_fix_rmsd"),
+                       f'AlphaFold-{algorithm[-1]} + Windowed MSA', colors['fix']))
+    return curves
+
+
+def render_panel(curves, output_file, dpi, title=None, legend_fontsize=18):
+    """Render one ECDF panel to disk; runs in a worker process"""
+    plt.figure(figsize=(12, 6))
+    for quantiles, probabilities, label, color in curves:
+        plt.plot(quantiles, probabilities, label=label, color=color, linewidth=3)
+
+    plt.xlim(0, 7)
+    plt.ylim(0, 1)
+    plt.xticks(fontsize=18)
+    plt.yticks(fontsize=18)
+    plt.xlabel('RMSD (Å)', fontsize=18)
+    plt.ylabel("Proportion of tags with RMSD < xÅ", fontsize=18)
+    if title is not None:
+        plt.title(title, fontsize=20)
+    plt.legend(fontsize=legend_fontsize, ncol=2, loc='lower right')
+    plt.grid(True, alpha=0.5)
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=dpi, bbox_inches='tight')
+    plt.close()
+    return output_file
+
+
+def make_figure(subsets, out_dir=".", preview=False, workers=None):
+    """Render the aggregate ECDF and one panel per scaffold + terminus combination"""
+    subset_ecdf = make_ecdf_lookup(subsets)
+    ext, dpi = ("png", PREVIEW_DPI) if preview else ("pdf", PDF_DPI)
+
+    # Aggregate plot uses the legend layout of the paper figure
+    jobs = [(panel_curves(subset_ecdf, "scaffold"),
+             os.path.join(out_dir, f'aggregate_before_vs_after_fix.{ext}'), dpi, None, 18)]
+    # Create separate plots for each scaffold + terminus combination
+    for key in subsets:
+        if not isinstance(key, tuple):
+            continue
+        scaffold, terminus = key
+        jobs.append((panel_curves(subset_ecdf, key),
+                     os.path.join(out_dir, f'aggregate_rmsd_{scaffold}_{terminus}.{ext}'), dpi,
+                     f'Scaffold: {scaffold}, Terminus: {terminus}', 14))
+
+    if workers == 1:
+        return [render_panel(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_panel, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate and per-scaffold RMSD ECDFs before/after windowed MSA")
+    parser.add_argument('--results', default=RESULTS_CSV,
+                        help=f'Results CSV (default: {RESULTS_CSV})')
+    parser.add_argument('--out-dir', default='.',
+                        help='Output directory for the figures (default: current directory)')
+    parser.add_argument('--preview', action='store_true',
+                        help=f'Write low-resolution PNG previews ({PREVIEW_DPI} dpi) instead of {PDF_DPI} dpi PDFs')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of rendering processes (default: one per CPU, 1 renders serially)')
+    args = parser.parse_args()
+
+    # Remove corrupt tags
+    df = remove_corrupt_tags(load_results(args.results))
+    subsets = prepare_subsets(df, select_good_tags(df))
+    os.makedirs(args.out_dir, exist_ok=True)
+    for output_file in make_figure(subsets, args.out_dir, args.preview, args.workers):
+        print(f"Created: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Build all paper figures from a single data load
+
+The results tables are read and cleaned once, then fig1-fig4 and the B-factor
+variant are rendered as tasks on a process pool that shares the prepared frames.
+Figures whose inputs (CSV contents and plotting code) have not changed since the
+last build and whose output files are all still present are skipped.
+
+Usage:
+    python figures.py [--out-dir figures] [--only fig2 fig3] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")
+
+import common
+import fig1
+import fig2
+import fig3
+import fig3_bfactor
+import fig4
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = ".figures_cache.json"
+
+# Figure name -> (module, result tables it reads)
+FIGURES = {
+    "fig1": (fig1, ["results"]),
+    "fig2": (fig2, ["results"]),
+    "fig3": (fig3, ["results"]),
+    "fig3_bfactor": (fig3_bfactor, ["bfactors"]),
+    "fig4": (fig4, ["results"]),
+}
+
+# Frames shared with the worker processes, set once per worker by the initializer
+_frames = None
+
+
+def _init_worker(frames):
+    global _frames
+    _frames = frames
+
+
+def render_figure(name, out_dir):
+    """Render one figure from the shared frames and return its wall time and output files"""
+    start = time.perf_counter()
+    if name == "fig1":
+        outputs = fig1.make_figure(_frames["raw"], out_dir)
+    elif name == "fig2":
+        # Already running in a pool worker, so render the panels serially
+        subsets = fig2.prepare_subsets(_frames["results"], _frames["good_tags"])
+        outputs = fig2.make_figure(subsets, out_dir, workers=1)
+    elif name == "fig3":
+        outputs = [fig3.make_figure(_frames["results"], _frames["good_tags"], out_dir)]
+    elif name == "fig3_bfactor":
+        outputs = [fig3_bfactor.make_figure(_frames["bfactors"], _frames["bfactor_good_tags"], out_dir)]
+    elif name == "fig4":
+        outputs = [fig4.make_figure(_frames["results"], _frames["good_tags"], out_dir)]
+    else:
+        raise ValueError(f"Unknown figure: {name}")
+    return time.perf_counter() - start, [os.path.basename(path) for path in outputs]
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def figure_fingerprint(name, input_paths):
+    """Hash of everything a figure depends on: its input tables and plotting code"""
+    module, tables = FIGURES[name]
+    paths = [input_paths[table] for table in tables]
+    paths += [module.__file__, common.__file__]
+    return hashlib.sha256(
+        "\n".join(_file_sha256(path) for path in paths).encode()
+    ).hexdigest()
+
+
+def is_up_to_date(entry, fingerprint, out_dir):
+    """Whether a cache entry matches the current fingerprint and all its output files still exist"""
+    if not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+        return False
+    return all(os.path.exists(os.path.join(out_dir, name)) for name in entry.get("outputs", []))
+
+
+def load_cache(out_dir):
+    path = os.path.join(out_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_cache(out_dir, cache):
+    with open(os.path.join(out_dir, CACHE_FILE), 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def build_figures(names, out_dir, results_csv, bfactor_csv, workers=None, force=False):
+    """Render the requested figures, skipping unchanged ones; returns {name: seconds or None}"""
+    os.makedirs(out_dir, exist_ok=True)
+    input_paths = {"results": results_csv, "bfactors": bfactor_csv}
+    cache = {} if force else load_cache(out_dir)
+
+    fingerprints = {name: figure_fingerprint(name, input_paths) for name in names}
+    stale = [name for name in names if not is_up_to_date(cache.get(name), fingerprints[name], out_dir)]
+    timings = {name: None for name in names if name not in stale}
+    for name in timings:
+        print(f"Skipping {name}: inputs unchanged and outputs present")
+    if not stale:
+        return timings
+
+    start = time.perf_counter()
+    frames = common.prepare_frames(results_csv, bfactor_csv)
+    print(f"Loaded results in {time.perf_counter() - start:.2f}s")
+
+    errors = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(frames,)) as executor:
+            futures = {executor.submit(render_figure, name, out_dir): name for name in stale}
+            for future in as_completed(futures):
+                name = futures[future]
+                # A failed figure must not keep the others out of the cache
+                try:
+                    timings[name], outputs = future.result()
+                except Exception as e:
+                    errors[name] = e
+                    print(f"Failed {name}: {e}")
+                    continue
+                cache[name] = {"fingerprint": fingerprints[name], "outputs": outputs}
+                print(f"Built {name} in {timings[name]:.2f}s")
+    finally:
+        # Keep the figures that did build even if another one failed
+        save_cache(out_dir, cache)
+    if errors:
+        raise RuntimeError(f"Failed to build {', '.join(sorted(errors))}") from next(iter(errors.values()))
+    return timings
+
+
+def create_parser():
+    """Create command line argument parser"""
+    parser = argparse.ArgumentParser(
+        description="Build all AFChimera paper figures from one data load",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--results', default=os.path.join(HERE, common.RESULTS_CSV),
+                        help=f'Results CSV (default: {common.RESULTS_CSV})')
+    parser.add_argument('--bfactor-results', default=os.path.join(HERE, common.BFACTOR_CSV),
+                        help=f'Results CSV with mean B-factors (default: {common.BFACTOR_CSV})')
+    parser.add_argument('--out-dir', default='./figures',
+                        help='Output directory for the figures (default: ./figures)')
+    parser.add_argument('--only', nargs='+', choices=list(FIGURES), default=list(FIGURES),
+                        help='Build only these figures')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild figures even if their inputs have not changed')
+    return parser
+
+
+def main():
+    """Main function"""
+    args = create_parser().parse_args()
+
+    start = time.perf_counter()
+    timings = build_figures(args.only, args.out_dir, args.results, args.bfactor_results,
+                            workers=args.workers, force=args.force)
+    built = sum(seconds is not None for seconds in timings.values())
+    print(f"Built {built} of {len(timings)} figures in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Per-residue pLDDT store for tag-region analysis at scale
+
+Holds the per-residue confidence (B-factor column) of every predicted chimera
+as one flat float16 array plus an index of (tag_id, scaffold_id, terminus,
+method) records with their offset, length and tag residue range. Both are
+memory-mapped on load, and region means, junction windows and per-position
+profiles are computed for all records at once.
+
+Store layout (a directory):
+    plddt.f16   flat little-endian float16 values, records back to back
+    index.npy   structured array, one entry per record (see index_dtype)
+
+Usage:
+    # Tag-region mean pLDDT in the schema of tag_scaffold_results_fix_with_bfactors.csv
+    python plddt_store.py export plddt_store/ --results tag_scaffold_results_fix.csv --output tag_bfactors.csv
+
+    # Mean pLDDT within 10 residues of the fusion junction
+    python plddt_store.py export plddt_store/ --results tag_scaffold_results_fix.csv --region junction --window 10 --output junction_bfactors.csv
+"""
+
+import os
+import argparse
+
+import numpy as np
+
+
+VALUES_FILE = 'plddt.f16'
+INDEX_FILE = 'index.npy'
+VALUE_DTYPE = np.dtype('<f2')
+INDEX_DTYPE = np.dtype([
+    ('tag_id', 'U16'),
+    ('scaffold_id', 'U16'),
+    ('terminus', 'U1'),
+    ('method', 'U16'),
+    ('offset', '<i8'),
+    ('length', '<i4'),
+    ('tag_start', '<i4'),
+    ('tag_end', '<i4'),
+])
+
+
+def index_dtype(records):
+    """INDEX_DTYPE with each string field wide enough for the longest value in `records`,
+    so long IDs are never truncated (and merged) on save"""
+    fields = []
+    for i, name in enumerate(INDEX_DTYPE.names):
+        dtype = INDEX_DTYPE[name]
+        if dtype.kind == 'U':
+            width = max((len(record[i]) for record in records), default=0)
+            dtype = np.dtype(f'U{max(width, dtype.itemsize // 4)}')
+        fields.append((name, dtype))
+    return np.dtype(fields)
+
+
+class PlddtStoreWriter:
+    """Append per-residue pLDDT records to a store, creating it if needed"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        index_file = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_file):
+            index = np.load(index_file)
+            self.records = index.tolist()
+            self.offset = int((index['offset'] + index['length']).max(initial=0))
+        else:
+            self.records = []
+            self.offset = 0
+        self.values = open(os.path.join(directory, VALUES_FILE), 'ab')
+        # Drop values written after the last saved index by an interrupted run
+        self.values.truncate(self.offset * VALUE_DTYPE.itemsize)
+
+    def append(self, tag_id, scaffold_id, terminus, method, plddt, tag_start, tag_end):
+        """Append one prediction's per-residue values with its tag residue range (end exclusive)"""
+        plddt = np.asarray(plddt, dtype=VALUE_DTYPE)
+        plddt.tofile(self.values)
+        self.records.append((tag_id, scaffold_id, terminus, method,
+                             self.offset, len(plddt), tag_start, tag_end))
+        self.offset += len(plddt)
+
+    def flush(self):
+        """Flush values and replace the index, so every record appended so far survives a crash"""
+        self.values.flush()
+        index_file = os.path.join(self.directory, INDEX_FILE)
+        with open(index_file + '.tmp', 'wb') as f:
+            np.save(f, np.array(self.records, dtype=index_dtype(self.records)))
+        os.replace(index_file + '.tmp', index_file)
+
+    def close(self):
+        """Flush values and write the index"""
+        self.flush()
+        self.values.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PlddtStore:
+    """Read-only, memory-mapped view of a pLDDT store"""
+
+    def __init__(self, directory):
+        self.index = np.load(os.path.join(directory, INDEX_FILE), mmap_mode='r')
+        values_file = os.path.join(directory, VALUES_FILE)
+        if os.path.getsize(values_file) == 0:
+            self.values = np.zeros(0, dtype=VALUE_DTYPE)
+        else:
+            self.values = np.memmap(values_file, dtype=VALUE_DTYPE, mode='r')
+        self._cumsum = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def cumsum(self):
+        """Prefix sums of all values (float64, leading zero), computed once for region means"""
+        if self._cumsum is None:
+            self._cumsum = np.concatenate(([0.0], np.cumsum(self.values, dtype=np.float64)))
+        return self._cumsum
+
+    def junctions(self):
+        """Absolute position of the first residue after the fusion junction of each record
+
+        N-terminal fusions put the tag first, so the junction follows the tag;
+        C-terminal fusions put it last, so the junction precedes it. Records
+        without a scaffold have their junction at the tag start.
+        """
+        index = self.index
+        relative = np.where(index['terminus'] == 'N', index['tag_end'], index['tag_start'])
+        return index['offset'] + relative
+
+    def region_means(self, start, end):
+        """Mean value over absolute ranges [start, end) per record, NaN for empty ranges"""
+        cumsum = self.cumsum()
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        counts = end - start
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (cumsum[end] - cumsum[start]) / counts
+        return np.where(counts > 0, means, np.nan)
+
+    def tag_means(self):
+        """Mean pLDDT over the tag residues of each record"""
+        offset = self.index['offset']
+        return self.region_means(offset + self.index['tag_start'], offset + self.index['tag_end'])
+
+    def junction_means(self, window):
+        """Mean pLDDT within `window` residues on either side of each fusion junction"""
+        offset = self.index['offset']
+        junction = self.junctions()
+        start = np.maximum(junction - window, offset)
+        end = np.minimum(junction + window, offset + self.index['length'])
+        return self.region_means(start, end)
+
+    def junction_profiles(self, window):
+        """Per-position pLDDT (n_records, 2 * window) centred on each junction, NaN outside the chain"""
+        offset = self.index['offset'][:, None]
+        positions = self.junctions()[:, None] + np.arange(-window, window)[None, :]
+        valid = (positions >= offset) & (positions < offset + self.index['length'][:, None])
+        profiles = np.full(positions.shape, np.nan)
+        profiles[valid] = self.values[positions[valid]]
+        return profiles
+
+    def tag_profiles(self, length=None):
+        """Per-position pLDDT (n_records, length) over each tag, from its first residue, NaN padded"""
+        tag_length = self.index['tag_end'] - self.index['tag_start']
+        length = int(tag_length.max(initial=0)) if length is None else length
+        start = (self.index['offset'] + self.index['tag_start'])[:, None]
+        positions = start + np.arange(length)[None, :]
+        valid = np.arange(length)[None, :] < tag_length[:, None]
+        profiles = np.full(positions.shape, np.nan)
+        profiles[valid] = self.values[positions[valid]]
+        return profiles
+
+    def to_frame(self, means):
+        """Per-record means as a wide frame with one <method>_mean_bfactor column per method
+        of evaluate.METHODS, NaN for methods without predictions"""
+        import pandas as pd
+        from evaluate import METHODS
+
+        frame = pd.DataFrame({
+            'tag_id': self.index['tag_id'],
+            'scaffold_id': self.index['scaffold_id'],
+            'terminus': self.index['terminus'],
+            'method': self.index['method'],
+            'mean_bfactor': means,
+        })
+        wide = frame.pivot_table(index=['tag_id', 'scaffold_id', 'terminus'], columns='method',
+                                 values='mean_bfactor', aggfunc='last')
+        wide = wide.reindex(columns=METHODS)
+        wide.columns = [f"{method}_mean_bfactor" for method in wide.columns]
+        return wide.reset_index()
+
+
+def export_bfactors(store, results_csv, region='tag', window=10):
+    """Results table with its *_mean_bfactor columns replaced by region means from the store"""
+    import pandas as pd
+
+    means = store.tag_means() if region == 'tag' else store.junction_means(window)
+    bfactors = store.to_frame(means)
+    results = pd.read_csv(results_csv)
+    results = results.drop(columns=[c for c in results.columns if c.endswith('_mean_bfactor')])
+    results['terminus'] = results['terminus'].fillna('')
+    return results.merge(bfactors, on=['tag_id', 'scaffold_id', 'terminus'], how='left')
+
+
+def create_parser():
+    """Create command line argument parser"""
+    parser = argparse.ArgumentParser(
+        description="AFChimera - per-residue pLDDT store queries",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help='Write region mean pLDDT in the results CSV schema')
+    export.add_argument('store', help='pLDDT store directory written by evaluate.py --plddt-store')
+    export.add_argument('--results', required=True,
+                        help='Results CSV providing the RMSD and num_msa_hits columns')
+    export.add_argument('--region', choices=['tag', 'junction'], default='tag',
+                        help='Region to average over (default: tag)')
+    export.add_argument('--window', type=int, default=10,
+                        help='Residues on either side of the junction for --region junction (default: 10)')
+    export.add_argument('--output', required=True,
+                        help='Output CSV, readable by figs_reproduction/fig3_bfactor.py --results')
+    return parser
+
+
+def main():
+    """Main function"""
+    args = create_parser().parse_args()
+
+    store = PlddtStore(args.store)
+    frame = export_bfactors(store, args.results, args.region, args.window)
+    frame.to_csv(args.output, index=False)
+    print(f"Wrote {args.region} mean pLDDT of {len(store)} predictions to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
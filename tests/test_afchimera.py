@@ -0,0 +1,226 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import afchimera  # noqa: E402
+
+
+# Two search blocks, each starting with the query, with one hit header repeated
+MULTI_BLOCK_A3M = """\
+#6\t1
+>101
+ACDEFG
+>h1 uniref
+AC-EFG
+>h2 uniref
+--DEFG
+>101
+ACDEFG
+>h1 uniref
+ACDEF-
+>h3 env
+ACDeEFG
+"""
+
+# Same content with sequences wrapped over several lines and padded line ends
+WRAPPED_A3M = MULTI_BLOCK_A3M.replace("ACDeEFG\n", "ACD\neEFG  \n").replace(">h2 uniref\n", ">h2 uniref\r\n")
+
+EXPECTED_SEQUENCES = {
+    '>101': 'ACDEFG',
+    '>h1 uniref': 'AC-EFG',
+    '>h2 uniref': '--DEFG',
+    '>h1_2 uniref': 'ACDEF-',
+    '>h3 env': 'ACDeEFG',
+}
+
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'w', newline='') as f:
+        f.write(content)
+    return str(path)
+
+
+def as_bytes(sequences):
+    return {seq_id.encode(): sequence.encode() for seq_id, sequence in sequences.items()}
+
+
+@pytest.mark.parametrize("content", [MULTI_BLOCK_A3M, WRAPPED_A3M])
+def test_parsers_merge_blocks_and_rename_duplicates(tmp_path, content):
+    filename = write_file(tmp_path, 'msa.a3m', content)
+
+    text_stats, bytes_stats = {}, {}
+    text = afchimera.parse_a3m_file(filename, text_stats)
+    binary = afchimera.parse_a3m_bytes(afchimera.read_a3m_bytes(filename), bytes_stats)
+
+    assert text == EXPECTED_SEQUENCES
+    assert list(text) == list(EXPECTED_SEQUENCES)
+    assert binary == as_bytes(EXPECTED_SEQUENCES)
+    assert list(binary) == list(as_bytes(EXPECTED_SEQUENCES))
+    assert text_stats == bytes_stats == {'query_blocks': 2, 'recovered_rows': 1}
+
+
+def test_bytes_fast_path_merges_query_blocks(tmp_path):
+    # Only the query repeats, which the single-line fast path handles itself
+    content = MULTI_BLOCK_A3M.replace(">h1 uniref\nACDEF-\n", "")
+    filename = write_file(tmp_path, 'msa.a3m', content)
+
+    text_stats, bytes_stats = {}, {}
+    expected = {seq_id: seq for seq_id, seq in EXPECTED_SEQUENCES.items() if seq_id != '>h1_2 uniref'}
+    assert afchimera.parse_a3m_file(filename, text_stats) == expected
+    assert afchimera.parse_a3m_bytes(afchimera.read_a3m_bytes(filename), bytes_stats) == as_bytes(expected)
+    assert text_stats == bytes_stats == {'query_blocks': 2, 'recovered_rows': 0}
+
+
+def test_renamed_header_skips_taken_names(tmp_path):
+    content = "#3\t1\n>101\nACD\n>h1\nAC-\n>h1_2\n-CD\n>h1\nA--\n"
+    filename = write_file(tmp_path, 'msa.a3m', content)
+
+    expected = {'>101': 'ACD', '>h1': 'AC-', '>h1_2': '-CD', '>h1_3': 'A--'}
+    assert afchimera.parse_a3m_file(filename) == expected
+    assert afchimera.parse_a3m_bytes(afchimera.read_a3m_bytes(filename)) == as_bytes(expected)
+
+
+SCAFFOLD_A3M = """\
+#6\t1
+>101
+MKVLAT
+>s1
+MKv-LAT
+>s2
+----AT
+>s3
+MK----
+>s4
+MK-LaAT
+"""
+
+TAG_A3M = """\
+#3\t1
+>101
+GSS
+>t1
+G-S
+"""
+
+
+def read_text(filename):
+    with open(filename, 'r') as f:
+        return f.read()
+
+
+def test_crop_range_keeps_columns_next_to_junction():
+    assert afchimera.crop_range(10, 4, True) == (0, 4)
+    assert afchimera.crop_range(10, 4, False) == (6, 10)
+    assert afchimera.crop_range(3, 4, False) == (0, 3)
+    with pytest.raises(ValueError):
+        afchimera.crop_range(10, 0, True)
+
+
+@pytest.mark.parametrize("row", ['ABcdCDE', b'ABcdCDE'])
+def test_crop_a3m_row_keeps_only_inner_insertions(row):
+    assert afchimera.crop_a3m_row(row, 0, 2) == row[:2]  # Trailing insertion at the edge dropped
+    assert afchimera.crop_a3m_row(row, 2, 5) == row[4:]  # Leading insertion at the edge dropped
+    assert afchimera.crop_a3m_row(row, 1, 3) == row[1:5]  # Insertion between kept columns kept
+    assert afchimera.crop_a3m_row(row, 5, 6) == row[:0]
+
+
+@pytest.mark.parametrize("n_terminus, expected, tag_range, scaffold_range, source_range", [
+    (True, ">101\nGSSMKV\n>s1\n---MKv-\n>s3\n---MK-\n>s4\n---MK-\n>t1\nG-S---\n",
+     (0, 3), (3, 6), (0, 3)),
+    (False, ">101\nLATGSS\n>s1\nLAT---\n>s2\n-AT---\n>s4\nLaAT---\n>t1\n---G-S\n",
+     (3, 6), (0, 3), (3, 6)),
+])
+@pytest.mark.parametrize("binary", [True, False])
+def test_cropped_concatenation(tmp_path, n_terminus, expected, tag_range, scaffold_range, source_range, binary):
+    scaffold = write_file(tmp_path, 'scaffold.a3m', SCAFFOLD_A3M)
+    tag = write_file(tmp_path, 'tag.a3m', TAG_A3M)
+    output = str(tmp_path / 'chimera.a3m')
+
+    afchimera.windowed_concatenation(scaffold, tag, output, n_terminus, binary=binary, crop_window=3)
+
+    # Rows left without scaffold residues and absent from the tag MSA are dropped
+    assert read_text(output) == expected
+    assert afchimera.read_segments(afchimera.segments_path(output)) == {'tag': tag_range,
+                                                                        'scaffold': scaffold_range}
+    with open(afchimera.segments_path(output), 'r') as f:
+        crop = json.load(f)['crop']
+    assert (crop['source_start'], crop['source_end']) == source_range
+    assert crop['dropped_rows'] == 1
+
+
+RECORDS = [f">hit{i} é\nAC-{'D' * (i % 7)}EFG\n" for i in range(11)]
+
+
+@pytest.mark.parametrize("records", [RECORDS, [record.encode() for record in RECORDS]])
+@pytest.mark.parametrize("shards, keep_shards", [(1, False), (3, False), (3, True), (1, True), (20, False)])
+def test_write_msa_matches_single_write(tmp_path, monkeypatch, records, shards, keep_shards):
+    monkeypatch.setattr(afchimera, 'WRITE_BLOCK_RECORDS', 2)  # Several blocks per shard
+    output = str(tmp_path / 'out.a3m')
+
+    written = afchimera.write_msa(output, records, shards, keep_shards)
+
+    if keep_shards and shards > 1:
+        assert written == [afchimera.shard_path(output, i) for i in range(shards)]
+    else:
+        assert written == [output]
+    data = b''
+    for filename in written:
+        with open(filename, 'rb') as f:
+            data += f.read()
+    assert data == ''.join(RECORDS).encode()
+
+
+@pytest.mark.parametrize("shards, keep_shards, has_shards", [(1, True, False), (3, True, True), (3, False, False)])
+def test_sidecar_lists_only_real_shards(tmp_path, shards, keep_shards, has_shards):
+    scaffold = write_file(tmp_path, 'scaffold.a3m', SCAFFOLD_A3M)
+    tag = write_file(tmp_path, 'tag.a3m', TAG_A3M)
+    output = str(tmp_path / 'chimera.a3m')
+
+    written = afchimera.windowed_concatenation(scaffold, tag, output, True, shards, keep_shards)
+
+    with open(afchimera.segments_path(output), 'r') as f:
+        sidecar = json.load(f)
+    assert ('shards' in sidecar) == has_shards
+    if has_shards:
+        assert sidecar['shards'] == [os.path.basename(filename) for filename in written]
+
+
+@pytest.mark.parametrize("scaffold_content", [SCAFFOLD_A3M, MULTI_BLOCK_A3M, WRAPPED_A3M,
+                                              '#A3M\n' + SCAFFOLD_A3M.split('\n', 1)[1]])  # No length line
+@pytest.mark.parametrize("n_terminus", [True, False])
+def test_plan_matches_output(tmp_path, scaffold_content, n_terminus):
+    scaffold = write_file(tmp_path, 'scaffold.a3m', scaffold_content)
+    tag = write_file(tmp_path, 'tag.a3m', TAG_A3M)
+    output = str(tmp_path / 'chimera.a3m')
+
+    length, rows, output_bytes, exact = afchimera.plan_concatenation(scaffold, tag)
+    afchimera.windowed_concatenation(scaffold, tag, output, n_terminus)
+
+    with open(output, 'rb') as f:
+        data = f.read()
+    with open(afchimera.segments_path(output), 'r') as f:
+        sidecar = json.load(f)
+    assert exact
+    assert (length, rows, output_bytes) == (sidecar['length'], data.count(b'>'), len(data))
+
+
+@pytest.mark.parametrize("n_terminus", [True, False])
+def test_plan_bounds_cropped_output(tmp_path, n_terminus):
+    scaffold = write_file(tmp_path, 'scaffold.a3m', SCAFFOLD_A3M)
+    tag = write_file(tmp_path, 'tag.a3m', TAG_A3M)
+    output = str(tmp_path / 'chimera.a3m')
+
+    length, rows, output_bytes, exact = afchimera.plan_concatenation(scaffold, tag, crop_window=3)
+    afchimera.windowed_concatenation(scaffold, tag, output, n_terminus, crop_window=3)
+
+    with open(output, 'rb') as f:
+        data = f.read()
+    assert not exact
+    assert length == 6
+    assert rows >= data.count(b'>')
+    assert output_bytes >= len(data)
@@ -0,0 +1,52 @@
+import io
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluate import _parse_mmcif_ca, _parse_pdb_ca  # noqa: E402
+
+
+PDB_WITH_ION = """\
+ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00 90.00           N
+ATOM      2  CA  MET A   1      11.639   6.071  -5.147  1.00 91.00           C
+ATOM      3  CA  GLY A   2      12.000   7.000  -4.000  1.00 92.00           C
+HETATM    4 CA    CA A 101       1.000   2.000   3.000  1.00 50.00          CA
+ATOM      5  CA  GLY B   1      13.000   8.000  -3.000  1.00 93.00           C
+"""
+
+MMCIF_WITH_ION = """\
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.type_symbol
+_atom_site.label_atom_id
+_atom_site.label_alt_id
+_atom_site.label_asym_id
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.B_iso_or_equiv
+_atom_site.pdbx_PDB_model_num
+ATOM 1 C CA . A 1.0 2.0 3.0 90.0 1
+ATOM 2 C CA . A 2.0 2.0 3.0 91.0 1
+HETATM 3 CA CA . B 9.0 9.0 9.0 50.0 1
+ATOM 4 C CA . C 5.0 2.0 3.0 91.0 1
+#
+"""
+
+
+def test_pdb_skips_calcium_and_other_chains():
+    coords, bfactors = _parse_pdb_ca(io.StringIO(PDB_WITH_ION))
+    assert coords == [(11.639, 6.071, -5.147), (12.0, 7.0, -4.0)]
+    assert bfactors == [91.0, 92.0]
+
+
+def test_mmcif_skips_calcium_and_other_chains():
+    coords, bfactors = _parse_mmcif_ca(io.StringIO(MMCIF_WITH_ION))
+    assert coords == [(1.0, 2.0, 3.0), (2.0, 2.0, 3.0)]
+    assert bfactors == [90.0, 91.0]